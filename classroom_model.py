@@ -1,44 +1,126 @@
 # classroom_model.py
 import numpy as np
 
+try:
+    from numba import njit
+    _HAVE_NUMBA = True
+except ImportError:
+    # Numba is optional; without it the kernel runs as plain Python
+    _HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        def wrap(func):
+            return func
+        return wrap
+
+@njit(cache=True, fastmath=True)
+def _step(co2, temperature, student_count, fan_on, ac_on, time_step,
+          co2_per_person, heat_per_person, room_volume,
+          eps_co2, eps_temp, eps_noise):
+    """One tick of the environment model as pure float arithmetic.
+
+    Free function so Numba can compile it to machine code with no
+    Python object overhead in the inner loop. The Gaussian samples are
+    drawn by the caller, keeping the Generator the single source of
+    randomness. Returns (co2, temperature, noise).
+    """
+    # CO₂ accumulation (simplified model)
+    co2 += student_count * co2_per_person * time_step
+    air_change_rate = 0.5 if fan_on else 0.1  # ACH (air changes per hour)
+    co2 -= air_change_rate * (co2 - 400) * time_step / 60
+
+    # Temperature change
+    heat_gain = student_count * heat_per_person * time_step / 3600
+    if ac_on:
+        heat_gain -= 2000 * time_step / 3600  # AC cooling
+    temperature += heat_gain / (room_volume * 1.2)
+
+    # Randomness to simulate real conditions
+    co2 += eps_co2 * 5
+    temperature += eps_temp * 0.1
+    noise = 40 + student_count * 0.8 + eps_noise * 2
+
+    return co2, temperature, noise
+
+@njit(cache=True, fastmath=True)
+def _simulate_span(student_counts, fan_on, ac_on, time_step,
+                   co2_per_person, heat_per_person, room_volume,
+                   co2_0, temp_0, noise_samples,
+                   co2_out, temp_out, noise_out):
+    """Fused whole-span kernel: one machine-code loop over all steps.
+
+    CO₂ and temperature stay in registers between iterations and each
+    output array is written exactly once per step, instead of the
+    NumPy scan materializing an intermediate array per expression.
+    """
+    co2 = co2_0
+    temp = temp_0
+    for i in range(student_counts.shape[0]):
+        co2, temp, noise = _step(
+            co2, temp, student_counts[i], fan_on[i], ac_on[i], time_step,
+            co2_per_person, heat_per_person, room_volume,
+            noise_samples[i, 0], noise_samples[i, 1], noise_samples[i, 2])
+        co2_out[i] = co2
+        temp_out[i] = temp
+        noise_out[i] = noise
+
 class ClassroomEnvironment:
-    def __init__(self, config):
+    # Slotted so per-tick attribute access is a fixed-offset load
+    # instead of a __dict__ lookup (config itself stays a plain dict)
+    __slots__ = ('config', 'co2', 'temperature', 'humidity', 'noise',
+                 'light', 'occupancy', 'student_count',
+                 'rng', '_noise_buf', '_noise_idx',
+                 '_room_cap', '_co2pp', '_heatpp', '_vol')
+
+    def __init__(self, config, seed=None):
         self.config = config
-        
+
+        # Hoisted once: these are read on every tick, and an attribute
+        # load is cheaper than a dict lookup per access
+        self._room_cap = config["room_capacity"]
+        self._co2pp = config["co2_per_person"]
+        self._heatpp = config["heat_per_person"]
+        self._vol = config["room_volume"]
+
         # Initial conditions
         self.co2 = 400  # ppm (fresh air)
         self.temperature = 22  # °C
         self.humidity = 50  # %
         self.noise = 40  # dB (quiet)
         self.light = 500  # lux
-        
+
         # Occupancy (0 = empty, 1 = full)
         self.occupancy = 0
         self.student_count = 0
-        
+
+        # One PCG64 generator for all randomness; scalar update() draws
+        # from a refillable buffer instead of calling into NumPy per tick
+        self.rng = np.random.default_rng(seed)
+        self._noise_buf = None
+        self._noise_idx = 0
+
+    def _next_noise(self):
+        """Next row of buffered standard-normal samples for update()"""
+        if self._noise_buf is None or self._noise_idx >= len(self._noise_buf):
+            self._noise_buf = self.rng.standard_normal((4096, 3))
+            self._noise_idx = 0
+        row = self._noise_buf[self._noise_idx]
+        self._noise_idx += 1
+        return row
+
     def update(self, time_step, student_count, fan_on=False, ac_on=False):
         """Update all environmental parameters for one time step"""
         self.student_count = student_count
-        self.occupancy = student_count / self.config["room_capacity"]
-        
-        # CO₂ accumulation (simplified model)
-        co2_production = student_count * self.config["co2_per_person"] * time_step
-        air_change_rate = 0.5 if fan_on else 0.1  # ACH (air changes per hour)
-        self.co2 += co2_production
-        self.co2 -= air_change_rate * (self.co2 - 400) * time_step / 60
-        
-        # Temperature change
-        heat_gain = student_count * self.config["heat_per_person"] * time_step / 3600
-        if ac_on:
-            heat_gain -= 2000 * time_step / 3600  # AC cooling
-        
-        self.temperature += heat_gain / (self.config["room_volume"] * 1.2)
-        
-        # Add some randomness to simulate real conditions
-        self.co2 += np.random.normal(0, 5)
-        self.temperature += np.random.normal(0, 0.1)
-        self.noise = 40 + (student_count * 0.8) + np.random.normal(0, 2)
-        
+        self.occupancy = student_count / self._room_cap
+
+        eps = self._next_noise()
+        self.co2, self.temperature, self.noise = _step(
+            float(self.co2), float(self.temperature),
+            student_count, fan_on, ac_on, time_step,
+            self._co2pp, self._heatpp, self._vol,
+            eps[0], eps[1], eps[2],
+        )
+
         return {
             "co2": max(400, self.co2),
             "temperature": self.temperature,
@@ -46,4 +128,77 @@ class ClassroomEnvironment:
             "noise": max(30, self.noise),
             "light": self.light,
             "occupancy": self.occupancy
+        }
+
+    def update_batch(self, student_counts, fan_on, ac_on, time_step=1):
+        """Update the environment for a whole block of time steps at once.
+
+        Vectorized equivalent of calling update() once per step: all three
+        state equations are solved with array operations instead of a
+        per-minute Python loop, which is where almost all the runtime goes.
+
+        student_counts, fan_on and ac_on are arrays with one entry per
+        time step. Returns a dict of arrays with the same keys as update().
+        """
+        student_counts = np.asarray(student_counts, dtype=np.int32)
+        fan_on = np.asarray(fan_on, dtype=bool)
+        ac_on = np.asarray(ac_on, dtype=bool)
+        n = len(student_counts)
+        dt = time_step
+
+        # One draw for all the per-step randomness instead of 3 scalar
+        # calls per minute
+        noise_samples = self.rng.standard_normal((n, 3))
+
+        if _HAVE_NUMBA:
+            # Fused kernel: one compiled pass, no intermediate arrays
+            co2 = np.empty(n)
+            temperature = np.empty(n)
+            noise = np.empty(n)
+            _simulate_span(
+                student_counts, fan_on, ac_on, float(dt),
+                self._co2pp, self._heatpp, self._vol,
+                float(self.co2), float(self.temperature), noise_samples,
+                co2, temperature, noise)
+        else:
+            # CO₂: each step is c' = (1 - k)*(c + production) + k*400 + eps,
+            # a linear recurrence c[i+1] = a[i]*c[i] + b[i]. Solve it in one
+            # pass with cumprod/cumsum: c = A * (c0 + cumsum(b / A)) where
+            # A = cumprod(a).
+            co2_production = student_counts * self._co2pp * dt
+            air_change_rate = np.where(fan_on, 0.5, 0.1)
+            k = air_change_rate * dt / 60
+            a = 1 - k
+            b = a * co2_production + k * 400 + noise_samples[:, 0] * 5
+            A = np.cumprod(a)
+            co2 = A * (self.co2 + np.cumsum(b / A))
+
+            # Temperature is a pure cumulative sum of the per-step heat gain
+            heat_gain = student_counts * self._heatpp * dt / 3600
+            heat_gain = heat_gain - np.where(ac_on, 2000 * dt / 3600, 0)
+            temperature = self.temperature + np.cumsum(
+                heat_gain / (self._vol * 1.2)
+                + noise_samples[:, 1] * 0.1
+            )
+
+            # Noise has no memory at all
+            noise = 40 + student_counts * 0.8 + noise_samples[:, 2] * 2
+
+        occupancy = student_counts / self._room_cap
+
+        # Carry the final state forward so scalar update() calls can
+        # continue from where the batch left off
+        self.co2 = co2[-1]
+        self.temperature = temperature[-1]
+        self.noise = noise[-1]
+        self.student_count = int(student_counts[-1])
+        self.occupancy = occupancy[-1]
+
+        return {
+            "co2": np.maximum(400, co2),
+            "temperature": temperature,
+            "humidity": np.full(n, self.humidity, dtype=np.float64),
+            "noise": np.maximum(30, noise),
+            "light": np.full(n, self.light, dtype=np.float64),
+            "occupancy": occupancy
         }
\ No newline at end of file
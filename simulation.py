@@ -1,59 +1,82 @@
 # simulation.py
-import simpy
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import matplotlib.pyplot as plt
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    # pyarrow is optional; results fall back to CSV without it
+    pa = None
 from config import SIMULATION_CONFIG
 from classroom_model import ClassroomEnvironment
 from ml_model import LearningEnvironmentClassifier
 
 class SmartClassroomSimulation:
-    def __init__(self, env, config):
-        self.env = env
+    __slots__ = ('config', 'classroom', 'ml_classifier', 'interventions',
+                 'fan_on', 'ac_on', 'lights_on', 'log',
+                 '_co2_max', '_temp_max', '_noise_max')
+
+    def __init__(self, config, ml_classifier=None, seed=None):
         self.config = config
-        self.classroom = ClassroomEnvironment(config)
-        self.ml_classifier = LearningEnvironmentClassifier()
-        
-        # Load or train ML model
-        try:
-            self.ml_classifier.load_model("trained_model.pkl")
-        except:
-            print("No pre-trained model found. Please train a model first.")
-        
+        self.classroom = ClassroomEnvironment(config, seed=seed)
+
+        # Hoisted intervention thresholds: read on every ML check
+        self._co2_max = config["thresholds"]["co2_max"]
+        self._temp_max = config["thresholds"]["temp_max"]
+        self._noise_max = config["thresholds"]["noise_max"]
+
+        # Load or train ML model (or reuse one the caller already loaded)
+        if ml_classifier is not None:
+            self.ml_classifier = ml_classifier
+        else:
+            self.ml_classifier = LearningEnvironmentClassifier()
+            try:
+                self.ml_classifier.load_model("trained_model.pkl")
+            except:
+                print("No pre-trained model found. Please train a model first.")
+
         # Simulation state
         self.interventions = []
-        self.log = []
         self.fan_on = False
         self.ac_on = False
         self.lights_on = True
-        
-        # Start processes
-        self.env.process(self.school_day_schedule())
-        self.env.process(self.ml_monitoring())
-        self.env.process(self.data_logging())
-    
+
+        # Preallocated log: one row per time step in a single contiguous
+        # buffer, so logging is a slice assignment and the results
+        # DataFrame is built from the records without copying row dicts
+        n_steps = config["simulation_duration"] // config["time_step"]
+        self.log = np.zeros(n_steps, dtype=[
+            ('timestamp', 'i4'),
+            ('student_count', 'i2'),
+            ('co2', 'f4'),
+            ('temperature', 'f4'),
+            ('humidity', 'f4'),
+            ('noise', 'f4'),
+            ('light', 'f4'),
+            ('occupancy', 'f4'),
+            ('fan_on', '?'),
+            ('ac_on', '?'),
+        ])
+
     def school_day_schedule(self):
-        """Simulate a typical school day schedule"""
-        # Morning: empty classroom
-        yield self.env.timeout(60)  # 8:00-9:00 AM
-        
-        # First class: 30 students
-        for _ in range(90):  # 90 minutes
-            self.update_environment(30)
-            yield self.env.timeout(1)
-        
-        # Break: 15 minutes
-        for _ in range(15):
-            self.update_environment(5)  # few students remain
-            yield self.env.timeout(1)
-        
-        # Second class: 25 students
-        for _ in range(90):
-            self.update_environment(25)
-            yield self.env.timeout(1)
-        
-        # And so on...
-    
+        """Student count for each minute of a typical school day"""
+        return np.concatenate([
+            np.zeros(60, dtype=np.int32),        # 8:00-9:00 AM: empty classroom
+            np.full(90, 30, dtype=np.int32),     # First class: 30 students
+            np.full(15, 5, dtype=np.int32),      # Break: few students remain
+            np.full(90, 25, dtype=np.int32),     # Second class: 25 students
+            np.zeros(60, dtype=np.int32),        # Lunch break
+            np.full(90, 30, dtype=np.int32),     # Third class: 30 students
+            np.full(15, 5, dtype=np.int32),      # Break
+            np.zeros(60, dtype=np.int32),        # After school
+        ])[:self.config["simulation_duration"]]
+
     def update_environment(self, student_count):
         """Update classroom environment"""
         env_data = self.classroom.update(
@@ -63,96 +86,144 @@ class SmartClassroomSimulation:
             ac_on=self.ac_on
         )
         return env_data
-    
-    def ml_monitoring(self):
-        """Monitor environment using ML model"""
-        while True:
-            # Get current environment
-            env_data = self.classroom.update(
-                time_step=1,
-                student_count=self.classroom.student_count,
-                fan_on=self.fan_on,
-                ac_on=self.ac_on
-            )
-            
-            # Predict if environment is conducive
-            prediction = self.ml_classifier.predict(env_data)
-            
-            # Trigger interventions if not conducive
-            if not prediction["conducive"]:
-                self.trigger_interventions(env_data, prediction)
-            
-            yield self.env.timeout(5)  # Check every 5 minutes
-    
-    def trigger_interventions(self, env_data, prediction):
-        """Trigger appropriate interventions"""
-        intervention = {
-            "time": self.env.now,
-            "co2": env_data["co2"],
-            "temperature": env_data["temperature"],
-            "action": None
-        }
-        
-        # Check each parameter and trigger appropriate response
-        if env_data["co2"] > self.config["thresholds"]["co2_max"]:
-            intervention["action"] = "activate_ventilation"
-            self.fan_on = True
-            print(f"[{self.env.now}min] CO₂ high ({env_data['co2']}ppm) - Fan ON")
-        
-        elif env_data["temperature"] > self.config["thresholds"]["temp_max"]:
-            intervention["action"] = "activate_ac"
-            self.ac_on = True
-            print(f"[{self.env.now}min] Temp high ({env_data['temperature']}°C) - AC ON")
-        
-        elif env_data["noise"] > self.config["thresholds"]["noise_max"]:
-            intervention["action"] = "send_alert"
-            print(f"[{self.env.now}min] Noise high ({env_data['noise']}dB) - Alert sent")
-        
-        self.interventions.append(intervention)
-    
-    def data_logging(self):
-        """Log all simulation data"""
-        while True:
-            env_data = self.classroom.update(
-                time_step=1,
-                student_count=self.classroom.student_count,
-                fan_on=self.fan_on,
-                ac_on=self.ac_on
-            )
-            
-            log_entry = {
-                "timestamp": self.env.now,
-                "student_count": self.classroom.student_count,
-                **env_data,
-                "fan_on": self.fan_on,
-                "ac_on": self.ac_on
-            }
-            
-            self.log.append(log_entry)
-            yield self.env.timeout(1)  # Log every minute
-    
-    def run(self):
+
+    def run(self, save_plot=True):
         """Run the simulation"""
         print("Starting simulation...")
-        self.env.run(until=self.config["simulation_duration"])
+        self._simulate()
         print(f"Simulation complete. Logged {len(self.log)} entries.")
-        
-        # Save results
+
+        # Save results; plotting is opt-out for headless parameter sweeps,
+        # where figure layout and PNG encoding dominate the runtime
         self.save_results()
-        self.visualize_results()
-    
+        if save_plot:
+            self.visualize_results()
+
+    def _simulate(self):
+        """Fill the log with one full day's trajectory"""
+        duration = self.config["simulation_duration"]
+        student_counts = self.school_day_schedule()
+        columns = ["co2", "temperature", "humidity", "noise", "light", "occupancy"]
+        self.log["timestamp"] = np.arange(duration)
+        self.log["student_count"] = student_counts
+
+        # Simulate in segments: the rest of the day is computed in one
+        # vectorized update_batch pass under the current fan/AC state, and
+        # all 5-minute ML checks in that span go through a single
+        # predict_batch call. Only a check that actually toggles the fan
+        # or AC cuts the segment short, because that changes the dynamics
+        # from the next minute on; the tail is then re-simulated under
+        # the new state. The fan and AC never turn off, so there are at
+        # most three segments per day.
+        t = 0
+        while t < duration:
+            remaining = duration - t
+            seg = self.classroom.update_batch(
+                student_counts[t:],
+                np.full(remaining, self.fan_on),
+                np.full(remaining, self.ac_on),
+            )
+
+            # ML checks land on whole-day minutes 0, 5, 10, ... A toggle
+            # on the day's last check leaves a tail segment with no
+            # checks in it; keep that tail whole rather than handing
+            # predict_batch an empty batch.
+            check_offsets = np.arange(-t % 5, remaining, 5)
+            fan_before, ac_before = self.fan_on, self.ac_on
+            toggled = False
+            cut = remaining
+            if check_offsets.size:
+                X = np.stack(
+                    [seg[name][check_offsets]
+                     for name in ("co2", "temperature", "noise", "light")],
+                    axis=1
+                ).astype(np.float32)
+                preds, probs = self.ml_classifier.predict_batch(X)
+
+                # Branchless intervention cascade over all checks at once.
+                # The masks keep the old if/elif semantics - ventilation wins
+                # over AC, AC over a noise alert - without a Python branch
+                # per row.
+                non_conducive = ~preds
+                fan_trigger = non_conducive & (X[:, 0] > self._co2_max)
+                ac_trigger = non_conducive & ~fan_trigger & (X[:, 1] > self._temp_max)
+                alert_trigger = (non_conducive & ~fan_trigger & ~ac_trigger
+                                 & (X[:, 2] > self._noise_max))
+
+                # The first check that actually flips a device ends the segment
+                state_change = np.flatnonzero(
+                    (fan_trigger & (not fan_before)) | (ac_trigger & (not ac_before)))
+                toggled = state_change.size > 0
+                stop = state_change[0] + 1 if toggled else len(check_offsets)
+
+                # Record the non-conducive checks in the accepted span; the
+                # decisions are already in the masks, this is just logging
+                for i in np.flatnonzero(non_conducive[:stop]):
+                    time_i = t + int(check_offsets[i])
+                    action = None
+                    if fan_trigger[i]:
+                        action = "activate_ventilation"
+                        self.fan_on = True
+                        print(f"[{time_i}min] CO₂ high ({X[i, 0]}ppm) - Fan ON")
+                    elif ac_trigger[i]:
+                        action = "activate_ac"
+                        self.ac_on = True
+                        print(f"[{time_i}min] Temp high ({X[i, 1]}°C) - AC ON")
+                    elif alert_trigger[i]:
+                        action = "send_alert"
+                        print(f"[{time_i}min] Noise high ({X[i, 2]}dB) - Alert sent")
+                    self.interventions.append({
+                        "time": time_i,
+                        "co2": float(X[i, 0]),
+                        "temperature": float(X[i, 1]),
+                        "action": action
+                    })
+
+                if toggled:
+                    cut = int(check_offsets[stop - 1]) + 1
+
+            # Keep the accepted span of the trajectory
+            for name in columns:
+                self.log[name][t:t + cut] = seg[name][:cut]
+            self.log["fan_on"][t:t + cut] = fan_before
+            self.log["ac_on"][t:t + cut] = ac_before
+            if toggled:
+                # The old loop logged the new state on the check minute
+                self.log["fan_on"][t + cut - 1] = self.fan_on
+                self.log["ac_on"][t + cut - 1] = self.ac_on
+
+            # Rewind the classroom state to the end of the accepted span
+            # before re-simulating the discarded tail
+            if cut < remaining:
+                self.classroom.co2 = seg["co2"][cut - 1]
+                self.classroom.temperature = seg["temperature"][cut - 1]
+                self.classroom.noise = seg["noise"][cut - 1]
+                self.classroom.student_count = int(student_counts[t + cut - 1])
+                self.classroom.occupancy = seg["occupancy"][cut - 1]
+
+            t += cut
+
     def save_results(self):
-        """Save simulation logs to CSV"""
-        df = pd.DataFrame(self.log)
+        """Save simulation logs to Parquet (CSV without pyarrow)"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"results/simulation_logs/simulation_{timestamp}.csv"
-        df.to_csv(filename, index=False)
+        if pa is not None:
+            # Parquet serializes the log's column buffers directly;
+            # CSV formats every cell into a Python string
+            filename = f"results/simulation_logs/simulation_{timestamp}.parquet"
+            table = pa.table(
+                {name: self.log[name] for name in self.log.dtype.names})
+            pq.write_table(table, filename, compression='snappy')
+        else:
+            filename = f"results/simulation_logs/simulation_{timestamp}.csv"
+            pd.DataFrame.from_records(self.log).to_csv(filename, index=False)
         print(f"Results saved to {filename}")
     
     def visualize_results(self):
         """Create visualization plots"""
-        df = pd.DataFrame(self.log)
-        
+        # One point per 5 minutes is visually identical and matplotlib's
+        # line rasterization is linear in point count
+        df = pd.DataFrame.from_records(self.log[::5])
+
         fig, axes = plt.subplots(3, 2, figsize=(15, 10))
         
         # CO₂ over time
@@ -200,16 +271,66 @@ class SmartClassroomSimulation:
         axes[2, 1].legend()
         
         plt.tight_layout()
-        plt.savefig('results/simulation_results.png', dpi=300)
+        plt.savefig('results/simulation_results.png', dpi=150)
         plt.show()
 
+# Worker-side state for run_replications: the classifier is loaded once
+# per worker process, not once per replication
+_worker_classifier = None
+
+def _init_worker(model_path):
+    """Load the trained model once in each worker process"""
+    global _worker_classifier
+    _worker_classifier = LearningEnvironmentClassifier()
+    try:
+        _worker_classifier.load_model(model_path)
+    except:
+        print("No pre-trained model found. Please train a model first.")
+
+def _run_one(seed_and_config):
+    """Run one full-day replication and return its log array"""
+    seed, config = seed_and_config
+    simulation = SmartClassroomSimulation(
+        config, ml_classifier=_worker_classifier, seed=seed
+    )
+    simulation._simulate()
+    return simulation.log
+
+def run_replications(n, base_config=SIMULATION_CONFIG,
+                     model_path="trained_model.pkl"):
+    """Run n independent whole-day replications across CPU cores.
+
+    Replications never interact, so whole days are farmed out to a
+    process pool with one worker per core, each seeded differently.
+    Returns an (n, steps) record array of the per-run logs.
+
+    The trained model is loaded exactly once per machine, not once per
+    run: under the fork start method it is loaded in the parent and the
+    children inherit the mmap-backed pages for free; under spawn each
+    worker loads it once through the pool initializer, and joblib's
+    mmap keeps the tree arrays shared via the page cache either way.
+    """
+    workers = os.cpu_count()
+    if multiprocessing.get_start_method() == 'fork':
+        _init_worker(model_path)
+        initializer, initargs = None, ()
+    else:
+        initializer, initargs = _init_worker, (model_path,)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=initializer,
+        initargs=initargs,
+    ) as executor:
+        logs = list(executor.map(
+            _run_one,
+            [(seed, base_config) for seed in range(n)],
+            chunksize=max(1, n // workers),
+        ))
+    return np.stack(logs)
+
 def main():
     """Main function to run the simulation"""
-    # Create simulation environment
-    env = simpy.Environment()
-    
-    # Create and run simulation
-    simulation = SmartClassroomSimulation(env, SIMULATION_CONFIG)
+    simulation = SmartClassroomSimulation(SIMULATION_CONFIG)
     simulation.run()
 
 if __name__ == "__main__":